@@ -1,10 +1,12 @@
 import streamlit as st
 import pandas as pd
-import time
-from datetime import datetime
+import numpy as np
+from datetime import date
 import logging
-import json
+import orjson
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 配置日志
 logging.basicConfig(
@@ -14,7 +16,7 @@ logging.basicConfig(
 )
 
 # 导入业务模块
-from src.data_fetcher import get_fund_holdings, get_realtime_stock_prices, get_fund_history_nav, get_fund_real_time_estimate_from_1234567
+from src.data_fetcher import get_fund_holdings, get_realtime_stock_prices, get_fund_history_nav, get_fund_real_time_estimate_from_1234567, get_fund_real_time_estimates_batch
 from src.valuation import estimate_nav_change
 
 # ====================== 页面配置 ======================
@@ -87,36 +89,71 @@ st.markdown("""
 
 VALUATION_OPTIONS = ["原有手动加权", "天天基金API"]
 SAVE_FILE = "fund_valuation_config.json"
+DEFAULT_FUNDS = "019454,165520,021986,025208,012544,012920,270023,001467,016532,018043,270042,166301,002611,457001,539002"
+DEFAULT_MAX_WORKERS = 16  # 默认并发度（纯网络 I/O，远高于 CPU 核数）
 
 # ====================== 持久化配置 ======================
 def load_config():
     if os.path.exists(SAVE_FILE):
-        with open(SAVE_FILE, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        with open(SAVE_FILE, 'rb') as f:
+            return orjson.loads(f.read())
     return {}
 
 def save_config(config):
-    with open(SAVE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(config, f, ensure_ascii=False, indent=2)
+    # 先写临时文件再原子替换，写到一半崩溃也不会留下损坏的配置
+    tmp_file = SAVE_FILE + ".tmp"
+    with open(tmp_file, 'wb') as f:
+        f.write(orjson.dumps(config, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_file, SAVE_FILE)
+
+# 进程内配置镜像 + 防抖写盘状态。脚本每次重跑都会重置模块变量，所以放在 cache_resource 里；
+# 新会话直接从镜像取配置，不再每次读文件
+@st.cache_resource
+def get_config_store():
+    return {"config": load_config(), "timer": None, "lock": threading.Lock()}
+
+def _flush_config():
+    store = get_config_store()
+    with store["lock"]:
+        save_config(store["config"])
+
+def save_config_debounced(config, delay=1.0):
+    """更新内存镜像，delay 秒内的连续保存合并成一次写盘"""
+    store = get_config_store()
+    with store["lock"]:
+        if store["config"] == config:
+            return  # 内容没变（如批量应用的方式与现有一致），不写盘
+        store["config"] = dict(config)
+        if store["timer"] is not None:
+            store["timer"].cancel()
+        store["timer"] = threading.Timer(delay, _flush_config)
+        store["timer"].start()
 
 if "fund_valuation_mode" not in st.session_state:
-    st.session_state["fund_valuation_mode"] = load_config()
-
-if "btn_clicked_code" not in st.session_state:
-    st.session_state["btn_clicked_code"] = None
-if "btn_clicked_mode" not in st.session_state:
-    st.session_state["btn_clicked_mode"] = None
-
-def change_valuation_mode(code, new_mode):
-    if code and new_mode:
-        st.session_state["fund_valuation_mode"][code] = new_mode
-        save_config(st.session_state["fund_valuation_mode"])
-        st.session_state["btn_clicked_code"] = None
-        st.session_state["btn_clicked_mode"] = None
-        try:
-            st.rerun()
-        except AttributeError:
-            st.experimental_rerun()
+    st.session_state["fund_valuation_mode"] = dict(get_config_store()["config"])
+
+# 待应用的估值方式修改：表格里改的方式先登记，点“应用”时一次性生效，多次修改只触发一轮抓取
+if "pending_modes" not in st.session_state:
+    st.session_state["pending_modes"] = {}
+# 配置生效后递增，换一个编辑器 key，让表格从新保存的方式重新开始
+if "mode_editor_version" not in st.session_state:
+    st.session_state["mode_editor_version"] = 0
+
+def apply_pending_modes():
+    pending = st.session_state["pending_modes"]
+    if pending:
+        st.session_state["fund_valuation_mode"].update(pending)
+        save_config_debounced(st.session_state["fund_valuation_mode"])
+        pending.clear()
+        st.session_state["mode_editor_version"] += 1
+
+def parse_fund_codes(text):
+    # 去重（保持输入顺序），非 6 位数字的直接丢弃，不再派发到线程里白白请求一次
+    tokens = [c.strip() for c in text.split(',') if c.strip()]
+    rejected = [c for c in tokens if not (c.isdigit() and len(c) == 6)]
+    if rejected:
+        logging.warning(f"忽略无效基金代码: {', '.join(rejected)}")
+    return list(dict.fromkeys(c for c in tokens if c.isdigit() and len(c) == 6))
 
 # ====================== 侧边栏 ======================
 if st.button("📱 基金配置 & 刷新", width='stretch'):
@@ -124,9 +161,8 @@ if st.button("📱 基金配置 & 刷新", width='stretch'):
 
 if st.session_state.get("sidebar_expanded", False):
     st.sidebar.header("配置")
-    default_funds = "019454,165520,021986,025208,012544,012920,270023,001467,016532,018043,270042,166301,002611,457001,539002"
-    fund_input = st.sidebar.text_area("基金代码", value=default_funds, height=160)
-    codes = [c.strip() for c in fund_input.split(',') if c.strip()]
+    fund_input = st.sidebar.text_area("基金代码", value=DEFAULT_FUNDS, height=160)
+    codes = parse_fund_codes(fund_input)
 
     for code in codes:
         if code not in st.session_state["fund_valuation_mode"]:
@@ -134,34 +170,65 @@ if st.session_state.get("sidebar_expanded", False):
     to_del = [k for k in st.session_state["fund_valuation_mode"] if k not in codes]
     for k in to_del:
         del st.session_state["fund_valuation_mode"][k]
+        st.session_state["pending_modes"].pop(k, None)
 
     st.sidebar.subheader("批量估值方式")
     batch_mode = st.sidebar.radio("默认方式", options=VALUATION_OPTIONS, index=0, horizontal=True)
     if st.sidebar.button("应用到所有基金", width='stretch'):
         for code in codes:
             st.session_state["fund_valuation_mode"][code] = batch_mode
-        save_config(st.session_state["fund_valuation_mode"])
+        save_config_debounced(st.session_state["fund_valuation_mode"])
+        st.session_state["pending_modes"].clear()
+        st.session_state["mode_editor_version"] += 1
         st.rerun()
 
     auto_refresh = st.sidebar.checkbox("自动刷新 60秒", value=False)
+    max_workers = st.sidebar.slider("并发度", min_value=5, max_value=32, value=DEFAULT_MAX_WORKERS,
+                                    help="同时抓取的基金数，网络较差时可调低")
     refresh_btn = st.sidebar.button("立即刷新", width='stretch')
 else:
-    default_funds = "019454,165520,021986,025208,012544,012920,270023,001467,016532,018043,270042,166301,002611,457001,539002"
-    codes = [c.strip() for c in default_funds.split(',') if c.strip()]
+    codes = parse_fund_codes(DEFAULT_FUNDS)
     auto_refresh = False
+    max_workers = DEFAULT_MAX_WORKERS
     refresh_btn = False
 
 # ====================== 业务逻辑 ======================
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
 @st.cache_data(ttl=3600)
 def fetch_history_cached(code, days):
     return get_fund_history_nav(code, days)
 
-def process_single_fund(code, valuation_mode):
+# 持仓一天最多变一次，落盘缓存，重启/多会话直接复用，避免冷启动时集中请求。
+# persist="disk" 下 ttl 不生效，改由 day（当天日期）参与缓存键按自然日失效。
+@st.cache_data(persist="disk", max_entries=500, show_spinner=False)
+def fetch_holdings_cached(code, day):
+    return get_fund_holdings(code)
+
+# 行情变化快，只缓存 10 秒，挡住连续重绘的重复请求
+@st.cache_data(ttl=10, show_spinner=False)
+def fetch_prices_cached(fetch_codes):
+    # fetch_codes 传 tuple，保证可哈希
+    return get_realtime_stock_prices(list(fetch_codes))
+
+# 天天基金估值大约一分钟才更新一次，缓存 45 秒
+@st.cache_data(ttl=45, show_spinner=False)
+def fetch_ttfund_estimate_cached(code):
+    return get_fund_real_time_estimate_from_1234567(code)
+
+@st.cache_data(ttl=45, show_spinner=False)
+def fetch_ttfund_estimates_batch_cached(codes):
+    # codes 传 tuple，保证可哈希
+    return get_fund_real_time_estimates_batch(list(codes))
+
+def fetch_holdings_stage(code, valuation_mode, day, ttfund_data=None):
+    """
+    第一阶段（并发）：天天API模式直接拿估值，手动加权模式只取持仓。
+    day 为本批次统一的日期（持仓缓存键），由 process_funds 算一次传入。
+    ttfund_data 为批量接口已取到的估值，没有时再单只请求。
+    返回 (结果行, 持仓)；持仓为 None 表示结果行已是最终结果。
+    """
     try:
         if valuation_mode == "天天基金API":
-            ttfund_data = get_fund_real_time_estimate_from_1234567(code)
+            ttfund_data = ttfund_data or fetch_ttfund_estimate_cached(code)
             if ttfund_data:
                 return {
                     '基金代码': code,
@@ -169,154 +236,201 @@ def process_single_fund(code, valuation_mode):
                     '估算涨跌': ttfund_data['estimate_change'],
                     '状态': '成功',
                     '估值方式': '天天基金API'
-                }
+                }, None
             else:
                 valuation_mode = "原有手动加权"
 
         if valuation_mode == "原有手动加权":
-            result_data = get_fund_holdings(code)
+            result_data = fetch_holdings_cached(code, day)
             if not result_data:
-                return {'基金代码': code,'基金名称': '--','估算涨跌': None,'状态': '失败','估值方式': '手动'}
+                # 抓取失败的空结果不能落盘一整天，清掉让下次重试
+                fetch_holdings_cached.clear(code, day)
+                return {'基金代码': code,'基金名称': '--','估算涨跌': None,'状态': '失败','估值方式': '手动'}, None
             fund_name, holdings = result_data[:2]
-            stock_fetch_codes = [h.get('fetch_code', h['code']) for h in holdings]
-            prices = get_realtime_stock_prices(stock_fetch_codes)
-            valuation = estimate_nav_change(holdings, prices)
             return {
                 '基金代码': code,
                 '基金名称': fund_name,
-                '估算涨跌': valuation['estimated_change'],
+                '估算涨跌': None,
                 '状态': '成功',
                 '估值方式': '手动加权'
-            }
+            }, holdings
 
     except Exception as e:
         logging.error(f"出错 {code}: {e}")
-        return {'基金代码': code,'基金名称': 'Error','估算涨跌': None,'状态': '错误','估值方式': '-'}
+    return {'基金代码': code,'基金名称': 'Error','估算涨跌': None,'状态': '错误','估值方式': '-'}, None
+
+def compute_valuation_stage(row, holdings, prices):
+    """第二阶段（本地计算）：用全量行情快照估算单只基金"""
+    try:
+        valuation = estimate_nav_change(holdings, prices, with_details=False)
+        row['估算涨跌'] = valuation['estimated_change']
+    except Exception as e:
+        logging.error(f"出错 {row['基金代码']}: {e}")
+        row.update({'基金名称': 'Error', '估算涨跌': None, '状态': '错误', '估值方式': '-'})
+    return row
+
+# 线程池跨重绘复用（自动刷新每分钟一轮），不再每次新建/销毁线程；按并发度各缓存一个
+@st.cache_resource(max_entries=4)
+def get_executor(max_workers):
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fund")
+
+def process_funds(code_list, max_workers=DEFAULT_MAX_WORKERS, on_progress=None):
+    """on_progress(rows)：第一阶段每完成一只基金回调一次，用于先把已有结果画出来"""
+    # 纯网络 I/O，基金数不超过并发度时全部同时发起
+    executor = get_executor(max_workers)
+    day = date.today().isoformat()
+    modes = {c: st.session_state["fund_valuation_mode"].get(c, "原有手动加权") for c in code_list if c.strip()}
+    # 手动加权的先派发去抓持仓；天天API模式的等一次批量估值请求回来再派发，批量里缺的才逐只兜底
+    futures_map = {
+        executor.submit(fetch_holdings_stage, c, m, day): c
+        for c, m in modes.items() if m != "天天基金API"
+    }
+    api_codes = [c for c, m in modes.items() if m == "天天基金API"]
+    if api_codes:
+        estimates = fetch_ttfund_estimates_batch_cached(tuple(api_codes))
+        futures_map.update({
+            executor.submit(fetch_holdings_stage, c, "天天基金API", day, estimates.get(c)): c
+            for c in api_codes
+        })
+    staged_map = {}
+    for done, future in enumerate(as_completed(futures_map), 1):
+        try:
+            staged_map[futures_map[future]] = future.result()
+        except:
+            pass
+        # 最后一只完成时不再回调，由调用方直接画最终结果
+        if on_progress and done < len(futures_map):
+            on_progress([row for row, _ in staged_map.values()])
+    # 按输入顺序排列，顺序稳定后概览表的缓存键也稳定
+    staged = [staged_map[c] for c in modes if c in staged_map]
+
+    # 所有基金的重仓股合并去重后只拉一次行情，重叠的热门股不再重复请求
+    all_fetch_codes = {
+        h.get('fetch_code', h['code'])
+        for _, holdings in staged if holdings
+        for h in holdings
+    }
+    prices = fetch_prices_cached(tuple(sorted(all_fetch_codes))) if all_fetch_codes else {}
 
-def process_funds(code_list):
     results = []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        futures_map = {
-            executor.submit(process_single_fund, c, st.session_state["fund_valuation_mode"].get(c, "原有手动加权")): c
-            for c in code_list if c.strip()
-        }
-        for future in as_completed(futures_map):
-            try:
-                results.append(future.result())
-            except:
-                pass
+    for row, holdings in staged:
+        if holdings is not None:
+            row = compute_valuation_stage(row, holdings, prices)
+        results.append(row)
     return results
 
 # ====================== 页面渲染 ======================
-dashboard = st.empty()
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_summary_df(rows, code_order):
+    """
+    rows: ((基金名称, 估算涨跌, 基金代码, 估值方式), ...)；code_order: 输入的基金代码顺序。
+    参数都是元组，数据不变时直接命中缓存，排序映射也只在未命中时构建。
+    """
+    # 先按输入顺序排好行元组再建表，不再建完 DataFrame 后整表 iloc 重排拷贝一次
+    code_order_map = {c: i for i, c in enumerate(code_order)}
+    rows = sorted(rows, key=lambda r: code_order_map.get(r[2], 999))
+    # 按列组装（AoS -> SoA），涨跌直接落成 float64，None 记为 NaN，省掉 dtype 推断
+    names, changes, fund_codes, modes = zip(*rows) if rows else ((), (), (), ())
+    chg = np.fromiter((np.nan if c is None else c for c in changes), dtype=np.float64, count=len(changes))
+    # 展示列在这里一次算好（缓存命中时不再重算），渲染时不走 Styler：🔴 涨 / 🟢 跌
+    sign = np.where(chg > 0, "🔴 ", np.where(chg < 0, "🟢 ", ""))
+    text = np.array(["{:+.2f}%".format(c) for c in chg], dtype=object)
+    return pd.DataFrame({
+        "基金名称": list(names),
+        "估算涨跌": chg,
+        "涨跌显示": np.where(np.isnan(chg), "--", sign + text),
+        "基金代码_内部": list(fund_codes),
+        "当前估值方式": list(modes),
+    })
+
+def render_summary_table(slot, data, valid_codes):
+    """把 data 画成概览表写入 slot（st.empty 占位），返回排好序的 DataFrame"""
+    summary = []
+    for item in data:
+        code = item.get("基金代码", "").strip()
+        if not code:
+            continue
+        summary.append((
+            item.get("基金名称", "--"),
+            item.get("估算涨跌"),
+            code,  # 基金代码_内部：内部用，不显示
+            st.session_state["fund_valuation_mode"].get(code, "原有手动加权")
+        ))
+
+    df = build_summary_df(tuple(summary), tuple(valid_codes))
+    view_df = df[["基金名称", "涨跌显示"]]
+
+    # 固定列宽配置：名称列宽占比大，涨跌列小且居中
+    column_config = {
+        "基金名称": st.column_config.TextColumn("基金名称", width=180),  # 自适应宽度
+        "涨跌显示": st.column_config.TextColumn("涨跌(%)", width="flex"),
+    }
 
-def render_dashboard():
-    if st.session_state["btn_clicked_code"] and st.session_state["btn_clicked_mode"]:
-        change_valuation_mode(
-            st.session_state["btn_clicked_code"],
-            st.session_state["btn_clicked_mode"]
-        )
-
-    with dashboard.container():
-        valid_codes = codes
-        if not valid_codes:
-            st.warning("请输入基金代码")
-            return
-        data = process_funds(valid_codes)
-
-        code_order_map = {c: i for i, c in enumerate(valid_codes)}
-        summary = []
-        for item in data:
-            code = item.get("基金代码", "").strip()
-            if not code:
-                continue
-            summary.append({
-                "排序": code_order_map.get(code, 999),
-                "基金名称": item.get("基金名称", "--"),
-                "估算涨跌": item.get("估算涨跌"),
-                "基金代码_内部": code,  # 内部用，不显示
-                "当前估值方式": st.session_state["fund_valuation_mode"].get(code, "原有手动加权")
-            })
-
-        df = pd.DataFrame(summary).sort_values("排序").drop(columns=["排序"])
-
-        # 涨跌颜色
-        def color_change(v):
-            if isinstance(v, (float, int)):
-                return 'background-color: #fef2f2; color: #e53e3e; font-weight: 600' if v > 0 else \
-                       'background-color: #f0fdf4; color: #22c55e; font-weight: 600' if v < 0 else \
-                       'color: #6b7280'
-            return ''
-
-        # ====================== 核心：两列布局，无需滑动 ======================
-        st.subheader("📊 基金估值概览")
-        view_df = df[["基金名称", "估算涨跌"]].copy()
-
-        # 样式优化：涨跌列带背景色，更醒目
-        styler = view_df.style\
-            .format({"估算涨跌": "{:+.2f}%"}, na_rep="--")\
-            .map(color_change, subset=["估算涨跌"])\
-            .set_table_styles([
-                {'selector': 'th', 'props': [('background-color', '#f9fafb'), ('border', 'none')]},
-                {'selector': 'td', 'props': [('border', 'none')]},
-                {'selector': 'tr', 'props': [('border-bottom', '1px solid #f3f4f6')]},
-                {'selector': 'tr:last-child', 'props': [('border-bottom', 'none')]}
-            ])
-
-        # 固定列宽配置：名称列宽占比大，涨跌列小且居中
-        column_config = {
-            "基金名称": st.column_config.TextColumn("基金名称", width=180),  # 自适应宽度
-            "估算涨跌": st.column_config.NumberColumn("涨跌(%)", format="%.2f%%", width="flex"),
-        }
+    # 渲染表格：强制100%宽度，无横向滚动
+    slot.dataframe(
+        view_df,
+        column_config=column_config,
+        hide_index=True,
+        height=max(len(df), 1) * 38,  # 高度刚好匹配行数，无空白
+        width='stretch' # 占满宽度（只留这一个）
+    )
+    return df
 
-        # 渲染表格：强制100%宽度，无横向滚动
-        # 渲染表格：强制100%宽度，无横向滚动
-        st.dataframe(
-            styler,
-            column_config=column_config,
-            hide_index=True,
-            height=len(df) * 38,  # 高度刚好匹配行数，无空白
-            width='stretch' # 占满宽度（只留这一个）
-        )
-
-        # ====================== 操作区 ======================
-        st.subheader("⚙️ 估值方式切换")
-        for _, row in df.iterrows():
-            code = row["基金代码_内部"]
-            name = row["基金名称"]
-            mode = row["当前估值方式"]
-
-            st.markdown(f"**{name}**")
-            c1, c2 = st.columns(2)
-            with c1:
-                if st.button(
-                    "手动加权",
-                    key=f"m{code}",
-                    type="primary" if mode == "原有手动加权" else "secondary",
-                    width='stretch'
-                ):
-                    st.session_state["btn_clicked_code"] = code
-                    st.session_state["btn_clicked_mode"] = "原有手动加权"
-            with c2:
-                if st.button(
-                    "天天API",
-                    key=f"a{code}",
-                    type="primary" if mode == "天天基金API" else "secondary",
-                    width='stretch'
-                ):
-                    st.session_state["btn_clicked_code"] = code
-                    st.session_state["btn_clicked_mode"] = "天天基金API"
-            st.divider()
+def render_dashboard():
+    valid_codes = codes
+    if not valid_codes:
+        st.warning("请输入基金代码")
+        return
+
+    # ====================== 核心：两列布局，无需滑动 ======================
+    st.subheader("📊 基金估值概览")
+    # 先占位，基金逐只完成就逐步刷新表格，不必等最慢的那只
+    table_slot = st.empty()
+    data = process_funds(
+        valid_codes, max_workers,
+        on_progress=lambda rows: render_summary_table(table_slot, rows, valid_codes)
+    )
+    df = render_summary_table(table_slot, data, valid_codes)
+
+    # ====================== 操作区 ======================
+    render_mode_editor(df["基金代码_内部"].tolist(), df["基金名称"].tolist(), df["当前估值方式"].tolist())
+
+# 编辑器单独成 fragment：改单元格只重跑这一小块，不会连带重跑看板、重新拉估值；
+# 点“应用”后才整页重跑一次，按新方式估值
+@st.fragment
+def render_mode_editor(fund_codes, fund_names, saved_modes):
+    st.subheader("⚙️ 估值方式切换")
+    # 一个可编辑表格代替每只基金一对按钮，改动只登记为待应用
+    editor_key = f"mode_editor_{st.session_state['mode_editor_version']}_{hash(tuple(fund_codes))}"
+    edited = st.data_editor(
+        pd.DataFrame({"基金名称": fund_names, "估值方式": saved_modes}),
+        column_config={
+            "基金名称": st.column_config.TextColumn("基金名称", disabled=True),
+            "估值方式": st.column_config.SelectboxColumn("估值方式", options=VALUATION_OPTIONS, required=True),
+        },
+        hide_index=True,
+        num_rows="fixed",
+        height=(len(fund_codes) + 1) * 38,
+        width='stretch',
+        key=editor_key
+    )
+
+    pending = {
+        code: new_mode
+        for code, saved, new_mode in zip(fund_codes, saved_modes, edited["估值方式"].tolist())
+        if new_mode != saved
+    }
+    st.session_state["pending_modes"] = pending
+    if pending:
+        c1, c2 = st.columns([2, 1])
+        c1.info(f"{len(pending)} 项修改待应用")
+        if c2.button("应用", type="primary", width='stretch'):
+            apply_pending_modes()
+            st.rerun()
 
 # ====================== 运行 ======================
-render_dashboard()
-
-if auto_refresh:
-    time.sleep(60)
-    try:
-        st.rerun()
-    except AttributeError:
-        st.experimental_rerun()
+# 自动刷新交给 fragment 定时重跑看板，不再 sleep 阻塞脚本线程，期间按钮照常响应
+st.fragment(render_dashboard, run_every=60 if auto_refresh else None)()
 
 if st.button("🔄 立即刷新所有数据", width='stretch'):
     try:
@@ -1,14 +1,51 @@
 import requests
 import re
-import json
+import orjson
 import logging
+import functools
 import pandas as pd
 from io import StringIO
+from lxml import html as lxml_html
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from typing import Dict, List, Optional, Tuple
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+# Shared HTTP session: keep-alive connections to eastmoney / sina / 1234567 are
+# pooled and reused across calls and worker threads instead of re-handshaking.
+# One quick retry absorbs the occasional reset keep-alive socket; a browser UA
+# is sent by default so calls without their own headers are not rejected.
+_SESSION = requests.Session()
+_SESSION.headers.update({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+})
+_ADAPTER = HTTPAdapter(pool_connections=20, pool_maxsize=50,
+                       max_retries=Retry(total=1, backoff_factor=0.2))
+_SESSION.mount('http://', _ADAPTER)
+_SESSION.mount('https://', _ADAPTER)
+
+# Long-lived pool for the history page and quote batch fan-outs, reused across
+# calls instead of spinning up (and tearing down) threads per call.
+_IO_EXECUTOR = ThreadPoolExecutor(max_workers=10, thread_name_prefix='fetch-io')
+
+# Patterns used on every holdings / name lookup, compiled once at import.
+_RE_TITLE = re.compile(r"title='(.*?)'")
+_RE_DATE = re.compile(r"截止至：<font class='px12'>(.*?)</font>")
+_RE_UNIFY = re.compile(r"unify/r/(\d+)\.([a-zA-Z0-9]+)")
+_RE_ALPHA = re.compile(r"[a-zA-Z]")
+_RE_JBGK_NAME = re.compile(r"基金全称.*?<td>(.*?)</td>", re.DOTALL)
+_RE_ZQCC_LINK = re.compile(r"fund\.eastmoney\.com/\d+\.html'>(.*?)</a>")
+_RE_LINK_CLASS_SUFFIX = re.compile(r"联接[A-Z]?$")
+_RE_CLASS_SUFFIX = re.compile(r"[A-E]$")
+
+# EastMoney market id -> Sina prefix, and A-share first digit -> Sina prefix
+# (6/9/5 Shanghai, 4/8 Beijing, everything else Shenzhen).
+_MARKET_PREFIX = {0: 'sz', 1: 'sh'}
+_ASHARE_PREFIX = {'6': 'sh', '9': 'sh', '5': 'sh', '4': 'bj', '8': 'bj'}
+
 def get_fund_real_time_estimate_from_1234567(fund_code: str) -> dict:
     """
     调用天天基金API获取基金实时估值（核心补充接口）
@@ -22,11 +59,10 @@ def get_fund_real_time_estimate_from_1234567(fund_code: str) -> dict:
     }
     
     try:
-        response = requests.get(url, headers=headers, timeout=5)
+        response = _SESSION.get(url, headers=headers, timeout=5)
         # 接口返回格式：jsonpgz({"fundcode":"002611","name":"易方达蓝筹精选混合","jzrq":"2026-02-11","dwjz":"1.3500","gsz":"1.3620","gszzl":"0.89","gztime":"2026-02-12 14:30:00"});
-        # 提取JSON部分
-        data_str = response.text.lstrip("jsonpgz(").rstrip(");")
-        data = json.loads(data_str)
+        # 提取JSON部分（直接在字节上切，orjson 解析 UTF-8 字节，省一次整段解码）
+        data = orjson.loads(response.content.lstrip(b"jsonpgz(").rstrip(b");"))
         
         # 格式化返回数据
         return {
@@ -41,6 +77,54 @@ def get_fund_real_time_estimate_from_1234567(fund_code: str) -> dict:
     except Exception as e:
         logging.error(f"调用天天基金API失败（{fund_code}）：{e}")
         return {}
+
+def get_fund_real_time_estimates_batch(fund_codes: List[str]) -> Dict[str, dict]:
+    """
+    一次请求批量获取多只基金的天天基金实时估值（移动端 FundMNFInfo 接口，Fcodes 逗号分隔）
+    返回：{基金代码: 与 get_fund_real_time_estimate_from_1234567 相同结构的字典}
+    没有估值（如 QDII 返回 "--"）或请求失败的基金不在结果里，由调用方逐只兜底
+    """
+    url = "https://fundmobapi.eastmoney.com/FundMNewApi/FundMNFInfo"
+    headers = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Referer": "https://fund.eastmoney.com/"
+    }
+    results = {}
+    batch_size = 200
+    for i in range(0, len(fund_codes), batch_size):
+        batch = fund_codes[i:i + batch_size]
+        params = {
+            "pageIndex": 1,
+            "pageSize": len(batch),
+            "plat": "Android",
+            "appType": "ttjj",
+            "product": "EFund",
+            "Version": "1",
+            "deviceid": "Wap",
+            "Fcodes": ",".join(batch),
+        }
+        try:
+            resp = _SESSION.get(url, params=params, headers=headers, timeout=5)
+            datas = orjson.loads(resp.content).get("Datas") or []
+        except Exception as e:
+            logging.error(f"批量调用天天基金API失败（{len(batch)} 只）：{e}")
+            continue
+        for item in datas:
+            try:
+                results[item["FCODE"]] = {
+                    "fund_code": item["FCODE"],
+                    "fund_name": item.get("SHORTNAME", ""),
+                    "date": item.get("PDATE", ""),  # 净值日期
+                    "nav": float(item.get("NAV") or 0),  # 最新单位净值
+                    "estimate_nav": float(item["GSZ"]),  # 实时估算净值
+                    "estimate_change": float(item["GSZZL"]),  # 实时估算涨跌幅（%）
+                    "update_time": item.get("GZTIME", "")  # 估值更新时间
+                }
+            except (KeyError, TypeError, ValueError):
+                # 无估值的基金字段为 "--"，跳过
+                continue
+    return results
+
 def get_fund_history_nav(fund_code: str, days: int = 365) -> Optional[pd.DataFrame]:
     """
     Fetches historical NAV data for the fund (parallel paging).
@@ -68,49 +152,63 @@ def get_fund_history_nav(fund_code: str, days: int = 365) -> Optional[pd.DataFra
                 'pageIndex': page,
                 'pageSize': 20,
             }
-            resp = requests.get(url, params=params, headers=headers, timeout=5)
-            # Response is JSON
-            data = resp.json()
+            resp = _SESSION.get(url, params=params, headers=headers, timeout=5)
+            # Response is JSON; orjson decodes the raw bytes directly
+            data = orjson.loads(resp.content)
             if 'Data' in data and data['Data'] and 'LSJZList' in data['Data']:
                 return data['Data']['LSJZList']
         except Exception as e:
             logging.warning(f"Error fetching page {page} for {fund_code}: {e}")
         return []
 
-    from concurrent.futures import ThreadPoolExecutor, as_completed
-    
-    # Use internal executor
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = [executor.submit(fetch_page, p) for p in range(1, max_pages + 1)]
-        for f in as_completed(futures):
-            res = f.result()
-            if res:
-                data_list.extend(res)
+    # Use the shared I/O executor
+    futures = [_IO_EXECUTOR.submit(fetch_page, p) for p in range(1, max_pages + 1)]
+    for f in as_completed(futures):
+        res = f.result()
+        if res:
+            data_list.extend(res)
     
     if not data_list:
         return None
         
     try:
-        # Convert to DF
-        df = pd.DataFrame(data_list)
-        # Columns: FSRQ (Date), DWJZ (Nav)
-        if 'FSRQ' in df.columns and 'DWJZ' in df.columns:
-            df = df[['FSRQ', 'DWJZ']].copy()
-            df.columns = ['date', 'nav']
-            df['date'] = pd.to_datetime(df['date'])
-            df['nav'] = pd.to_numeric(df['nav'], errors='coerce')
-            df.sort_values('date', inplace=True)
-            
-            # Filter by date limit locally to be precise
-            start_date = pd.Timestamp.now() - pd.Timedelta(days=days)
-            df = df[df['date'] >= start_date]
-            
-            return df
+        # Build only the two needed columns (FSRQ -> date, DWJZ -> nav) straight
+        # from the records, skipping the full object frame of every field.
+        dates = pd.to_datetime([d['FSRQ'] for d in data_list])
+        navs = pd.to_numeric([d['DWJZ'] for d in data_list], errors='coerce')
+        df = pd.DataFrame({'date': dates, 'nav': navs})
+        df.sort_values('date', inplace=True, kind='mergesort')
+        
+        # Filter by date limit locally to be precise.
+        # Already sorted, so a binary search replaces a full boolean mask.
+        start_date = pd.Timestamp.now() - pd.Timedelta(days=days)
+        return df.iloc[df['date'].searchsorted(start_date):]
     except Exception as e:
         logging.error(f"Error processing history for {fund_code}: {e}")
         
     return None
 
+def _memoize_found(func):
+    """
+    Memoizes a single-argument lookup for the life of the process. Only non-None
+    results are kept: these helpers return None on network errors too, and a
+    failed lookup should be retried next time rather than cached.
+    """
+    cache = {}
+    
+    @functools.wraps(func)
+    def wrapper(key):
+        if key in cache:
+            return cache[key]
+        result = func(key)
+        if result is not None:
+            cache[key] = result
+        return result
+    
+    wrapper.cache_clear = cache.clear
+    return wrapper
+
+@_memoize_found
 def _get_fund_name_backup(fund_code: str) -> Optional[str]:
     """
     Tries to get fund name from other pages (e.g. zqcc, jbgk) if jjcc is empty.
@@ -119,7 +217,7 @@ def _get_fund_name_backup(fund_code: str) -> Optional[str]:
     try:
         url = f"http://fundf10.eastmoney.com/jbgk_{fund_code}.html"
         headers = {'User-Agent': 'Mozilla/5.0'}
-        resp = requests.get(url, headers=headers, timeout=3)
+        resp = _SESSION.get(url, headers=headers, timeout=3)
         # Handle encoding
         if 'charset=gb2312' in resp.text:
             resp.encoding = 'gbk'
@@ -128,15 +226,10 @@ def _get_fund_name_backup(fund_code: str) -> Optional[str]:
         
         # Match <th>基金全称</th><td>...</td> in liberal mode (whitespace friendly)
         # Pattern usually: <th ...>基金全称</th> <td>Full Name</td>
-        # Using a simpler text scan might be safer if HTML varies
-        
-        match = re.search(r"基金全称.*?<td>(.*?)</td>", resp.text, re.DOTALL)
+        # (covers the strict <th>基金全称</th>\s*<td> form as well)
+        match = _RE_JBGK_NAME.search(resp.text)
         if match:
              return match.group(1).strip()
-            
-        match = re.search(r"<th>基金全称</th>\s*<td>(.*?)</td>", resp.text)
-        if match:
-            return match.group(1).strip()
     except Exception as e:
         logging.warning(f"JBGK backup fetch failed: {e}")
 
@@ -148,26 +241,27 @@ def _get_fund_name_backup(fund_code: str) -> Optional[str]:
         'Referer': f'http://fundf10.eastmoney.com/ccmx_{fund_code}.html'
     }
     try:
-        resp = requests.get(url, params=params, headers=headers, timeout=3)
+        resp = _SESSION.get(url, params=params, headers=headers, timeout=3)
         # Match <a href='...'>Name</a>
-        match = re.search(r"fund.eastmoney.com/\d+.html'>(.*?)</a>", resp.text)
+        match = _RE_ZQCC_LINK.search(resp.text)
         if match:
             return match.group(1)
         # Fallback for title='...'
-        match = re.search(r"title='(.*?)'", resp.text)
+        match = _RE_TITLE.search(resp.text)
         if match:
             return match.group(1)
     except:
         pass
     return None
 
+@_memoize_found
 def _search_etf_code(etf_name: str) -> Optional[str]:
     """
     Searches for an ETF code by name using Sina Suggest.
     """
     try:
         url = f"http://suggest3.sinajs.cn/suggest/type=&key={etf_name}"
-        resp = requests.get(url, timeout=3)
+        resp = _SESSION.get(url, timeout=3)
         content = resp.content.decode('gbk', errors='ignore')
         # Format: var suggestvalue="Name,Count,Code,...;..."
         if 'suggestvalue="' in content:
@@ -210,48 +304,49 @@ def get_fund_holdings(fund_code: str) -> Optional[Tuple[str, List[Dict[str, floa
     holdings = []
     
     try:
-        response = requests.get(url, params=params, headers=headers, timeout=5)
+        response = _SESSION.get(url, params=params, headers=headers, timeout=5)
         response.raise_for_status()
         content = response.text
         
         # Try to extract Name first from the HTML snippet inside content
-        name_match = re.search(r"title='(.*?)'", content)
+        name_match = _RE_TITLE.search(content)
         if name_match:
             fund_name = name_match.group(1)
             
         # Try to extract report date: 截止至：<font class='px12'>2025-12-31</font>
         # or similar
-        date_match = re.search(r"截止至：<font class='px12'>(.*?)</font>", content)
+        date_match = _RE_DATE.search(content)
         if date_match:
              report_date = date_match.group(1)
         
-        # Parse Content
-        match = re.search(r'content:"(.*?)",\s*\w+\s*[:=]', content, re.DOTALL)
+        # Parse Content: the table is the string literal after content:" up to the next ",
+        # Two linear find() scans, no DOTALL regex over the whole body
         html_table = ""
-        
-        if match:
-            html_table = match.group(1)
-        else:
-             try:
-                part1 = content.split('content:"')[1]
-                html_table = part1.split('",')[0]
-             except:
-                pass
+        start = content.find('content:"')
+        if start >= 0:
+            start += len('content:"')
+            end = content.find('",', start)
+            html_table = content[start:end] if end >= 0 else content[start:]
 
         has_data = False
         if html_table and "暂无数据" not in html_table and len(html_table) > 50:
-             # Parse Table with Regex to capture Links/Market IDs
-             # Pattern for rows
-             rows = re.findall(r"<tr>(.*?)</tr>", html_table, re.DOTALL)
+             # Parse the table once with lxml; rows/cells/links come straight from the DOM
+             tree = lxml_html.fromstring(html_table)
              
-             for row_html in rows:
+             for tr in tree.iter('tr'):
                  # Skip header
-                 if "th" in row_html: continue
+                 if tr.find('th') is not None: continue
                  
                  try:
+                     tds = tr.findall('td')
+                     if len(tds) < 7: continue
+                     
                      # 1. Extract Code and Market from Link
                      # href='//quote.eastmoney.com/unify/r/116.00700'
-                     link_match = re.search(r"unify/r/(\d+)\.([a-zA-Z0-9]+)", row_html)
+                     link_match = None
+                     for href in tr.xpath('.//a/@href'):
+                         link_match = _RE_UNIFY.search(href)
+                         if link_match: break
                      
                      stock_code = "Unknown"
                      market_id = None
@@ -262,20 +357,13 @@ def get_fund_holdings(fund_code: str) -> Optional[Tuple[str, List[Dict[str, floa
                      else:
                          # Fallback to cell text if link not standard
                          # <td class='toc'>00700</td>
-                         # Try to find the second column
-                         cols = re.findall(r"<td.*?>(.*?)</td>", row_html, re.DOTALL)
-                         if len(cols) > 1:
-                             # Strip tags
-                             stock_code = re.sub(r"<.*?>", "", cols[1]).strip()
+                         stock_code = tds[1].text_content().strip()
                      
                      # Extract Name (3rd col)
-                     cols = re.findall(r"<td.*?>(.*?)</td>", row_html, re.DOTALL)
-                     if len(cols) < 7: continue
-                     
-                     stock_name = re.sub(r"<.*?>", "", cols[2]).strip()
+                     stock_name = tds[2].text_content().strip()
                      
                      # Extract Weight (7th col, index 6)
-                     weight_str = re.sub(r"<.*?>", "", cols[6]).strip().replace('%', '').replace(',', '')
+                     weight_str = tds[6].text_content().strip().replace('%', '').replace(',', '')
                      if not weight_str or weight_str == '--': continue
                      
                      weight = float(weight_str)
@@ -285,10 +373,8 @@ def get_fund_holdings(fund_code: str) -> Optional[Tuple[str, List[Dict[str, floa
                      
                      if market_id:
                          mid = int(market_id)
-                         if mid == 0: # SZ
-                             sina_code = f"sz{stock_code}"
-                         elif mid == 1: # SH
-                             sina_code = f"sh{stock_code}"
+                         if mid in _MARKET_PREFIX: # SZ / SH
+                             sina_code = f"{_MARKET_PREFIX[mid]}{stock_code}"
                          elif mid == 116: # HK
                              # Pad HK code to 5 digits for Sina
                              # EastMoney might give '700', '00700'. Sina needs '00700'.
@@ -297,19 +383,16 @@ def get_fund_holdings(fund_code: str) -> Optional[Tuple[str, List[Dict[str, floa
                              sina_code = f"gb_{stock_code.lower()}"
                          else:
                              # Default A-share fallback if ID known or new
-                             if stock_code.startswith('6') or stock_code.startswith('9'): sina_code = f"sh{stock_code}"
-                             else: sina_code = f"sz{stock_code}"
+                             sina_code = f"{_ASHARE_PREFIX.get(stock_code[:1], 'sz')}{stock_code}"
                      
                      else:
                          # Fallback logic if no link found
                          # Guess based on format
-                         if re.search(r'[a-zA-Z]', stock_code): sina_code = f"gb_{stock_code.lower()}"
+                         if _RE_ALPHA.search(stock_code): sina_code = f"gb_{stock_code.lower()}"
                          elif len(stock_code) < 6: sina_code = f"rt_hk{stock_code.zfill(5)}"
                          else: 
                              # Assume A-share
-                             if stock_code.startswith('6') or stock_code.startswith('5'): sina_code = f"sh{stock_code}"
-                             elif stock_code.startswith('4') or stock_code.startswith('8'): sina_code = f"bj{stock_code}"
-                             else: sina_code = f"sz{stock_code}"
+                             sina_code = f"{_ASHARE_PREFIX.get(stock_code[:1], 'sz')}{stock_code}"
                      
                      holdings.append({
                          'code': stock_code, # Display Code
@@ -361,33 +444,31 @@ def get_fund_holdings(fund_code: str) -> Optional[Tuple[str, List[Dict[str, floa
                 target_name = target_name.replace("人民币", "").replace("美元", "")
                 
                 # 3. Remove "Link" suffix
-                target_name = re.sub(r"联接[A-Z]?$", "", target_name) # Remove trail with class
-                target_name = re.sub(r"联接", "", target_name) # Remove anywhere
+                target_name = _RE_LINK_CLASS_SUFFIX.sub("", target_name) # Remove trail with class
+                target_name = target_name.replace("联接", "") # Remove anywhere
                 
                 # 4. Remove Class Suffix safely (only if at end, ensuring we don't kill "ETF")
                 # e.g. "Gold ETFA" -> "Gold ETF". "Gold ETF" -> "Gold ETF".
-                target_name = re.sub(r"[A-E]$", "", target_name)
+                target_name = _RE_CLASS_SUFFIX.sub("", target_name)
 
                 # Search
                 logging.info(f"Searching for target: {target_name}")
+                # Logic: If direct match fails, try adding ETF. The "+ETF" search is
+                # started alongside the direct one so a miss doesn't cost a second round trip.
+                alt_future = None
+                if "ETF" not in target_name:
+                    alt_future = _IO_EXECUTOR.submit(_search_etf_code, target_name + "ETF")
                 target_code = _search_etf_code(target_name)
                 
                 if target_code == fund_code:
                      target_code = None
                 
-                # Logic: If direct match fails, try adding/removing ETF
-                if not target_code:
-                     if "ETF" not in target_name:
-                         target_code = _search_etf_code(target_name + "ETF")
-                     else:
-                         # Try removing ETF if present? Rarely useful but maybe
-                         pass
+                if not target_code and alt_future is not None:
+                    target_code = alt_future.result()
                 
                 if target_code and target_code != fund_code:
                     logging.info(f"Found target ETF: {target_code}")
-                    etf_fetch_code = target_code
-                    if target_code.startswith('5'): etf_fetch_code = f"sh{target_code}"
-                    else: etf_fetch_code = f"sz{target_code}"
+                    etf_fetch_code = f"{_ASHARE_PREFIX.get(target_code[:1], 'sz')}{target_code}"
                     
                     return (fund_name, [{'code': target_code, 'name': target_name, 'weight': 95.0, 'fetch_code': etf_fetch_code}], "实时追踪")
         
@@ -400,6 +481,74 @@ def get_fund_holdings(fund_code: str) -> Optional[Tuple[str, List[Dict[str, floa
         logging.error(f"Error fetching holdings for {fund_code}: {e}")
         return None
 
+def _fetch_price_batch(batch: List[str]) -> Dict[str, Dict]:
+    """
+    Fetches and parses one Sina hq batch (up to 20 codes).
+    """
+    results = {}
+    list_param = ",".join(batch)
+    url = f"http://hq.sinajs.cn/list={list_param}"
+    headers = {'Referer': 'http://finance.sina.com.cn/'}
+    
+    try:
+        resp = _SESSION.get(url, headers=headers, timeout=5)
+        # Quote fields are plain ASCII; only the stock name is GBK. Split the raw
+        # bytes and decode just the name instead of the whole payload.
+        for line in resp.content.split(b'\n'):
+            if not line.strip() or b'=""' in line: continue
+            
+            try:
+                head, sep, tail = line.partition(b'=')
+                if not sep: continue
+                
+                key = head.strip().rsplit(b'hq_str_', 1)[-1].decode('ascii', errors='ignore')
+                data_bytes = tail.strip(b' "\r;')
+                if not data_bytes: continue
+                data = data_bytes.split(b',')
+                
+                name = "Unknown"
+                price = 0.0
+                change_pct = 0.0
+                
+                # Determine Parser by Key Prefix
+                if key.startswith('rt_hk'): # HK
+                    if len(data) >= 9:
+                        name = data[1].decode('gbk', errors='ignore') # Chinese Name
+                        price = float(data[6])
+                        change_pct = float(data[8])
+                
+                elif key.startswith('gb_'): # US
+                    if len(data) >= 3:
+                        name = data[0].decode('gbk', errors='ignore')
+                        price = float(data[1])
+                        change_pct = float(data[2])
+                
+                else: # A-Share (sh/sz/bj)
+                    if len(data) >= 4:
+                        name = data[0].decode('gbk', errors='ignore')
+                        pre_close = float(data[2])
+                        current_price = float(data[3])
+                        price = current_price
+                        
+                        if pre_close > 0:
+                            change_pct = ((current_price - pre_close) / pre_close) * 100
+                        else:
+                            change_pct = 0.0
+                
+                results[key] = {
+                    'name': name,
+                    'price': price,
+                    'change': change_pct
+                }
+                
+            except Exception as e:
+                logging.warning(f"Failed to parse line for {key if 'key' in locals() else 'unknown'}: {e}")
+                continue
+    except Exception as e:
+         logging.error(f"Error fetching batch prices: {e}")
+    
+    return results
+
 def get_realtime_stock_prices(stock_codes: List[str]) -> Dict[str, Dict]:
     """
     Fetches real-time stock prices from Sina Finance.
@@ -409,74 +558,15 @@ def get_realtime_stock_prices(stock_codes: List[str]) -> Dict[str, Dict]:
         return {}
     
     unique_codes = list(set(stock_codes))
-    results = {}
+    batches = [unique_codes[i:i + 20] for i in range(0, len(unique_codes), 20)]
     
-    # Helper to chunk list
-    def chunked(l, n):
-        for i in range(0, len(l), n):
-            yield l[i:i + n]
-            
-    headers = {'Referer': 'http://finance.sina.com.cn/'}
+    # Batches are independent requests, so they go out concurrently on the
+    # shared I/O pool instead of one after another.
+    results = {}
+    if len(batches) == 1:
+        results.update(_fetch_price_batch(batches[0]))
+    else:
+        for batch_result in _IO_EXECUTOR.map(_fetch_price_batch, batches):
+            results.update(batch_result)
     
-    for batch in chunked(unique_codes, 20):
-        list_param = ",".join(batch)
-        url = f"http://hq.sinajs.cn/list={list_param}"
-        
-        try:
-            resp = requests.get(url, headers=headers, timeout=5)
-            content = resp.content.decode('gbk', errors='ignore')
-            
-            for line in content.strip().splitlines():
-                if not line or '=""' in line: continue
-                
-                try:
-                    parts = line.split('=')
-                    if len(parts) < 2: continue
-                    
-                    key = parts[0].strip().split('hq_str_')[-1]
-                    data_str = parts[1].strip('"')
-                    if not data_str: continue
-                    data = data_str.split(',')
-                    
-                    name = "Unknown"
-                    price = 0.0
-                    change_pct = 0.0
-                    
-                    # Determine Parser by Key Prefix
-                    if key.startswith('rt_hk'): # HK
-                        if len(data) >= 9:
-                            name = data[1] # Chinese Name
-                            price = float(data[6])
-                            change_pct = float(data[8])
-                    
-                    elif key.startswith('gb_'): # US
-                        if len(data) >= 3:
-                            name = data[0]
-                            price = float(data[1])
-                            change_pct = float(data[2])
-                    
-                    else: # A-Share (sh/sz/bj)
-                        if len(data) >= 4:
-                            name = data[0]
-                            pre_close = float(data[2])
-                            current_price = float(data[3])
-                            price = current_price
-                            
-                            if pre_close > 0:
-                                change_pct = ((current_price - pre_close) / pre_close) * 100
-                            else:
-                                change_pct = 0.0
-                    
-                    results[key] = {
-                        'name': name,
-                        'price': price,
-                        'change': change_pct
-                    }
-                    
-                except Exception as e:
-                    logging.warning(f"Failed to parse line for {key if 'key' in locals() else 'unknown'}: {e}")
-                    continue
-        except Exception as e:
-             logging.error(f"Error fetching batch prices: {e}")
-             
     return results
@@ -1,13 +1,53 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import logging
+import numpy as np
 
-def estimate_nav_change(holdings: List[Dict], prices: Dict[str, Dict]) -> Dict:
+# numba is optional: when installed, the reduction runs as one compiled loop
+# (no mask / fancy-index temporaries); otherwise the NumPy path below is used.
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+if njit is not None:
+    # No fastmath: it assumes NaN-free input, and NaN marks a missing quote here.
+    @njit(cache=True)
+    def _weighted_sum_jit(weights, changes):
+        total_weighted = 0.0
+        total_weight = 0.0
+        for i in range(weights.shape[0]):
+            c = changes[i]
+            if not np.isnan(c):
+                total_weighted += weights[i] * c
+                total_weight += weights[i]
+        return total_weighted, total_weight
+else:
+    _weighted_sum_jit = None
+
+def _weighted_sum(weights: np.ndarray, changes: np.ndarray) -> Tuple[float, float]:
+    """
+    Numeric core: weighted sum of changes over holdings that have a quote.
+    NaN in `changes` marks a missing quote and is excluded from both sums.
+    
+    Returns:
+        tuple: (sum(weight * change), sum(weight))
+    """
+    if _weighted_sum_jit is not None:
+        total_weighted, total_weight = _weighted_sum_jit(weights, changes)
+        return float(total_weighted), float(total_weight)
+    matched = ~np.isnan(changes)
+    w = weights[matched]
+    return float(np.dot(w, changes[matched])), float(w.sum())
+
+def estimate_nav_change(holdings: List[Dict], prices: Dict[str, Dict], with_details: bool = True) -> Dict:
     """
     Estimates the real-time NAV change based on holdings and current stock prices.
     
     Args:
         holdings: List of dicts, each having {'code', 'weight', ...}
         prices: Dict of {code: {'change': float, ...}}
+        with_details: Build the per-stock 'details' list. Callers that only need
+            the estimate can pass False to skip it ('details' is then empty).
         
     Returns:
         Dict: {
@@ -19,46 +59,39 @@ def estimate_nav_change(holdings: List[Dict], prices: Dict[str, Dict]) -> Dict:
     if not holdings:
         return {'estimated_change': 0.0, 'total_weight_used': 0.0, 'details': []}
         
-    total_weighted_change = 0.0
-    total_weight = 0.0
-    details = []
+    # SoA layout: one weight / change array per fund, reduced in a single dot product
+    n = len(holdings)
+    # Use fetch_code for lookup if available (for HK/US stocks), else fallback to display code
+    price_infos = [prices.get(item.get('fetch_code', item['code'])) for item in holdings]
+    weights = np.fromiter((item.get('weight', 0.0) for item in holdings), dtype=np.float64, count=n)
+    changes = np.fromiter(
+        (info.get('change', 0.0) if info else np.nan for info in price_infos),
+        dtype=np.float64, count=n
+    )
+    total_weighted_change, total_weight = _weighted_sum(weights, changes)
     
-    for item in holdings:
-        code = item['code']
-        # Use fetch_code for lookup if available (for HK/US stocks), else fallback to display code
-        lookup_code = item.get('fetch_code', code)
-        
-        weight = item.get('weight', 0.0)
-        
-        price_info = prices.get(lookup_code)
-        
-        if price_info:
-            change = price_info.get('change', 0.0)
-            current_price = price_info.get('price', 0.0)
-            name = price_info.get('name', item.get('name', 'Unknown'))
-            
-            weighted_change = change * weight
-            total_weighted_change += weighted_change
-            total_weight += weight
-            
-            details.append({
-                'code': code,
-                'name': name,
-                'weight': weight,
-                'price': current_price,
-                'change': change,
-                'contribution': weighted_change # Contribution to the sum, logic-wise
-            })
-        else:
-            # Stock price not found (e.g. HK stock or fetching failed)
-            details.append({
-                'code': code,
-                'name': item.get('name', 'Unknown'),
-                'weight': weight,
-                'price': None,
-                'change': None,
-                'contribution': 0.0
-            })
+    details = []
+    if with_details:
+        for item, price_info, weight, change in zip(holdings, price_infos, weights.tolist(), changes.tolist()):
+            if price_info:
+                details.append({
+                    'code': item['code'],
+                    'name': price_info.get('name', item.get('name', 'Unknown')),
+                    'weight': weight,
+                    'price': price_info.get('price', 0.0),
+                    'change': change,
+                    'contribution': change * weight # Contribution to the sum, logic-wise
+                })
+            else:
+                # Stock price not found (e.g. HK stock or fetching failed)
+                details.append({
+                    'code': item['code'],
+                    'name': item.get('name', 'Unknown'),
+                    'weight': weight,
+                    'price': None,
+                    'change': None,
+                    'contribution': 0.0
+                })
 
     if total_weight == 0:
         return {'estimated_change': 0.0, 'total_weight_used': 0.0, 'details': details}